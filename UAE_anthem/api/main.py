@@ -1,5 +1,10 @@
+import asyncio
+import concurrent.futures
+import functools
 import os
+import shutil
 import sys
+import tempfile
 import uuid
 import threading
 import time
@@ -7,13 +12,26 @@ from io import BytesIO
 from typing import Dict, Any, Optional
 from pathlib import Path
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    ORJSONResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
 from fastapi.staticfiles import StaticFiles
 
+import aiofiles
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+import redis
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 # Load .env FIRST
@@ -24,10 +42,20 @@ load_dotenv()
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, ROOT_DIR)
 
+from data_info import ASSETS
 from wave import nano_banana_edit, wans2v, generate_qr_code
 from quiz import get_random_questions, grade_answers
 
-app = FastAPI(title="UAE National Day Video API", version="1.0.0")
+# Valid age groups come straight from the asset table, frozen at import
+ALLOWED_AGE_GROUPS = frozenset(ASSETS)
+
+# orjson serializes responses in C, which matters for the hot status-poll
+# endpoints
+app = FastAPI(
+    title="UAE National Day Video API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
 
 # ========== CONFIG ==========
 # AWS S3 Config
@@ -46,6 +74,15 @@ PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "").rstrip("/")
 MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "10"))
 MAX_UPLOAD_SIZE = MAX_UPLOAD_SIZE_MB * 1024 * 1024
 
+# Magic numbers for the accepted image formats (Content-Type headers are
+# client-supplied, so the first bytes are checked too)
+JPEG_MAGIC = b"\xff\xd8\xff"
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+# Redis job store (survives restarts, shared across workers)
+REDIS_URL = os.getenv("REDIS_URL", "")
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", str(24 * 3600)))
+
 # Mock mode for testing (bypasses real AI services)
 MOCK_MODE = os.getenv("MOCK_MODE", "false").lower() == "true"
 
@@ -53,17 +90,31 @@ if MOCK_MODE:
     print("🎭 MOCK MODE ENABLED - Using test data instead of real AI services")
     print("   Set MOCK_MODE=false in .env to use real video generation")
 
+# ========== HTTP SESSION ==========
+# One shared session so media downloads reuse keep-alive connections
+# instead of paying a TCP+TLS handshake per request
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=64))
+
 # ========== INITIALIZE S3 ==========
 s3 = None
+sts = None
 if USE_S3:
     if not S3_BUCKET:
         raise RuntimeError("USE_S3=true requires AWS_S3_BUCKET")
     
-    # Configure S3 client with regional endpoint
+    # Configure S3 client with regional endpoint. The connection pool is
+    # sized above botocore's default of 10 so concurrent multipart uploads
+    # don't overflow the pool and pay a fresh TCP+TLS handshake each.
     s3_config = {
         "region_name": AWS_REGION,
         "aws_access_key_id": AWS_ACCESS_KEY_ID,
         "aws_secret_access_key": AWS_SECRET_ACCESS_KEY,
+        "config": Config(
+            max_pool_connections=64,
+            retries={"max_attempts": 3, "mode": "adaptive"},
+            tcp_keepalive=True,
+        ),
     }
     
     # Use regional endpoint URL for me-central-1 and other non-default regions
@@ -71,22 +122,49 @@ if USE_S3:
         s3_config["endpoint_url"] = f"https://s3.{AWS_REGION}.amazonaws.com"
     
     s3 = boto3.client("s3", **s3_config)
-    
-    # Verify credentials
+    sts = boto3.client(
+        "sts",
+        region_name=AWS_REGION,
+        aws_access_key_id=AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+    )
+
+# Set by the startup credential check; the pipeline only takes the S3
+# branch once credentials have actually been verified
+S3_READY = False
+
+
+@app.on_event("startup")
+async def _verify_s3_credentials():
+    """Verify AWS credentials once the app is up, not at import time.
+
+    The STS round-trip used to run at module import, adding 100-300ms to
+    every cold start before routes even existed. Failure is non-fatal:
+    jobs fall back to local storage and /healthz reports the S3 error.
+    """
+    global S3_READY
+    if not USE_S3:
+        return
     try:
-        sts = boto3.client(
-            "sts",
-            region_name=AWS_REGION,
-            aws_access_key_id=AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-        )
-        identity = sts.get_caller_identity()
+        identity = await asyncio.to_thread(sts.get_caller_identity)
+        S3_READY = True
         print(f"✅ S3 enabled - authenticated as: {identity['Arn']}")
     except Exception as e:
-        print(f"❌ S3 credential error: {e}")
-        raise
+        print(f"❌ S3 credential error: {e} - falling back to local storage")
 
 # ========== S3 HELPERS ==========
+# Multipart transfers: stream in fixed-size parts so peak memory stays
+# ~constant and the upload overlaps the download instead of waiting for
+# it. Shared by every upload_file/upload_fileobj call so all transfers
+# get the same tuned concurrency.
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=16,
+    max_io_queue=200,
+    use_threads=True,
+)
+
 def _s3_key(*parts: str) -> str:
     """Build S3 key path"""
     safe = [p.strip("/").replace("..", "") for p in parts if p]
@@ -97,12 +175,15 @@ def _s3_put_file(local_path: str, key: str, content_type: str) -> None:
     extra_args = {"ContentType": content_type}
     try:
         # Try the normal upload without ACL
-        s3.upload_file(Filename=local_path, Bucket=S3_BUCKET, Key=key, ExtraArgs=extra_args)
+        s3.upload_file(
+            Filename=local_path, Bucket=S3_BUCKET, Key=key,
+            ExtraArgs=extra_args, Config=TRANSFER_CONFIG,
+        )
     except ClientError as e:
         code = e.response.get("Error", {}).get("Code", "")
         if code == "AccessControlListNotSupported" or "AccessControlListNotSupported" in str(e):
             # Retry without ExtraArgs (older SDKs may require fewer params)
-            s3.upload_file(Filename=local_path, Bucket=S3_BUCKET, Key=key)
+            s3.upload_file(Filename=local_path, Bucket=S3_BUCKET, Key=key, Config=TRANSFER_CONFIG)
         else:
             raise
 
@@ -119,6 +200,45 @@ def _s3_put_bytes(data: bytes, key: str, content_type: str) -> None:
             raise
 
 
+def _s3_put_stream(fileobj, key: str, content_type: str) -> None:
+    """Stream a file-like object to S3 (multipart above the threshold, no ACL)."""
+    # Seekable buffers of known small size (original photos, QR codes) go
+    # through a single put_object, skipping the multipart handshake
+    if getattr(fileobj, "seekable", lambda: False)():
+        start = fileobj.tell()
+        fileobj.seek(0, os.SEEK_END)
+        size = fileobj.tell() - start
+        fileobj.seek(start)
+        if size <= TRANSFER_CONFIG.multipart_threshold:
+            s3.put_object(Bucket=S3_BUCKET, Key=key, Body=fileobj, ContentType=content_type)
+            return
+
+    s3.upload_fileobj(
+        fileobj,
+        S3_BUCKET,
+        key,
+        ExtraArgs={"ContentType": content_type},
+        Config=TRANSFER_CONFIG,
+    )
+
+
+def _upload_remote(url: str, key: str, content_type: str, timeout: int = 300) -> None:
+    """Download a remote file and stream it straight into S3.
+
+    The caller's content_type is authoritative; the origin's header is
+    only used when it names a concrete media type. Generic labels like
+    application/octet-stream would be stored on the S3 object and make
+    mobile browsers download presigned videos instead of streaming them.
+    """
+    with SESSION.get(url, stream=True, timeout=timeout) as resp:
+        resp.raise_for_status()
+        remote_type = resp.headers.get("Content-Type", "")
+        if remote_type.startswith(("image/", "video/")):
+            content_type = remote_type
+        resp.raw.decode_content = True
+        _s3_put_stream(resp.raw, key, content_type)
+
+
 def _s3_url_for_key(key: str, expires: int = 86400) -> str:
     """Get public URL for S3 key (CDN or presigned)"""
     if S3_PUBLIC_DOMAIN:
@@ -142,45 +262,78 @@ def _s3_url_for_key(key: str, expires: int = 86400) -> str:
             ExpiresIn=expires,
         )
 
+# ========== QR HELPERS ==========
+def _render_qr_png(url: str) -> BytesIO:
+    """Render a QR code for a URL into an in-memory PNG buffer."""
+    qr_img = generate_qr_code(url)
+    buf = BytesIO()
+    # Bilevel pixels and minimal deflate effort: QR modules compress
+    # trivially, so higher zlib levels only burn CPU
+    qr_img.convert("1").save(buf, format="PNG", optimize=False, compress_level=1)
+    buf.seek(0)
+    return buf
+
 # ========== LOCAL STORAGE HELPERS ==========
+# These buffered writes are deliberate: the saved files are served right
+# back through /media, so keeping them in the page cache is a feature
+# (O_DIRECT-style bypass would force a disk read on first playback).
 def _save_local_video(url: str, job_id: str) -> str:
-    """Download video from URL and save locally"""
-    response = requests.get(url, timeout=300)
-    response.raise_for_status()
-    
+    """Download video from URL and save locally (streamed, never fully in memory)"""
     file_path = os.path.join(ROOT_DIR, "result", "videos", f"{job_id}.mp4")
-    with open(file_path, "wb") as f:
-        f.write(response.content)
-    
+    with SESSION.get(url, stream=True, timeout=300) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        with open(file_path, "wb") as f:
+            shutil.copyfileobj(response.raw, f, length=1024 * 1024)
+
     print(f"Video saved locally to {file_path}")
     return file_path
 
 def _save_local_image(url: str, job_id: str) -> str:
-    """Download image from URL and save locally"""
-    response = requests.get(url, timeout=60)
-    response.raise_for_status()
-    
+    """Download image from URL and save locally (streamed, never fully in memory)"""
     file_path = os.path.join(ROOT_DIR, "result", "images", f"{job_id}.jpeg")
-    with open(file_path, "wb") as f:
-        f.write(response.content)
-    
+    with SESSION.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        with open(file_path, "wb") as f:
+            shutil.copyfileobj(response.raw, f, length=1024 * 1024)
+
     print(f"Image saved locally to {file_path}")
     return file_path
 
 # ========== SETUP DIRECTORIES ==========
-if not USE_S3:
-    # Only create local dirs when not using S3
-    os.makedirs(os.path.join(ROOT_DIR, "result", "videos"), exist_ok=True)
-    os.makedirs(os.path.join(ROOT_DIR, "result", "images"), exist_ok=True)
-    os.makedirs(os.path.join(ROOT_DIR, "result", "qr"), exist_ok=True)
-
-UPLOAD_DIR = os.path.join(ROOT_DIR, "uploads")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Local media dirs are always created: they are also the fallback when S3
+# credential verification fails at startup
+os.makedirs(os.path.join(ROOT_DIR, "result", "videos"), exist_ok=True)
+os.makedirs(os.path.join(ROOT_DIR, "result", "images"), exist_ok=True)
+os.makedirs(os.path.join(ROOT_DIR, "result", "qr"), exist_ok=True)
+
+# Quiz records are always written locally (even in S3 mode); create the
+# directory once here instead of stat()ing it on every answer POST
+QUIZ_DIR = os.path.join(ROOT_DIR, "result", "quiz")
+os.makedirs(QUIZ_DIR, exist_ok=True)
+
+# Serve local media (primary in local mode, fallback when S3 is down)
+MEDIA_ROOT = os.path.join(ROOT_DIR, "result")
+VIDEO_DIR = os.path.join(MEDIA_ROOT, "videos")
+
+
+# Explicit route for videos so they go out via FileResponse (sendfile
+# where available, with byte-range support for seekable playback).
+# Registered before the /media mount so it takes precedence.
+@app.get("/media/videos/{name}")
+async def media_video(name: str):
+    path = os.path.join(VIDEO_DIR, os.path.basename(name))
+    if not os.path.isfile(path):
+        raise HTTPException(404, detail="Video not found")
+    return FileResponse(
+        path,
+        media_type="video/mp4",
+        headers={"Accept-Ranges": "bytes"},
+    )
 
-# Serve local media only when S3 disabled
-if not USE_S3:
-    MEDIA_ROOT = os.path.join(ROOT_DIR, "result")
-    app.mount("/media", StaticFiles(directory=MEDIA_ROOT), name="media")
+# Images and QR codes still come from the generic mount
+app.mount("/media", StaticFiles(directory=MEDIA_ROOT), name="media")
 
 # ========== CORS ==========
 app.add_middleware(
@@ -191,23 +344,131 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ========== IN-MEMORY JOBS ==========
+# Compress JSON responses above ~200 bytes (question lists, rich status
+# payloads); tiny poll responses are cheaper uncompressed
+app.add_middleware(GZipMiddleware, minimum_size=200)
+
+# ========== JOB STORE ==========
+# Job state lives in Redis hashes when REDIS_URL is set, so status survives
+# restarts and can be shared across multiple Uvicorn workers. Without Redis
+# we fall back to the original in-process dict (fine for a single kiosk).
+redis_client = None
+if REDIS_URL:
+    redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+    print(f"✅ Redis job store enabled: {REDIS_URL}")
+
 JOBS: Dict[str, Dict[str, Any]] = {}
 JOBS_LOCK = threading.Lock()
 
+# Local-mode mirror of the Redis jobs:active set, so /healthz reads a set
+# size instead of scanning every historical job
+ACTIVE_LOCAL: set = set()
+
+# Terminal jobs are dropped from the local store after this long (Redis
+# mode relies on the per-key EXPIRE instead)
+JOB_REAP_SECONDS = int(os.getenv("JOB_REAP_SECONDS", "3600"))
+
+# Pipeline futures are process-local either way (a Future can't be shared)
+FUTURES: Dict[str, concurrent.futures.Future] = {}
+
+
+def _job_update(job_id: str, fields: Dict[str, Any]) -> None:
+    """Create or update a job record (Redis hash or in-process dict)."""
+    if redis_client is not None:
+        key = f"job:{job_id}"
+        mapping = {k: "" if v is None else str(v) for k, v in fields.items()}
+        redis_client.hset(key, mapping=mapping)
+        redis_client.expire(key, JOB_TTL_SECONDS)
+    else:
+        with JOBS_LOCK:
+            JOBS.setdefault(job_id, {}).update(fields)
+
+
+def _job_get(job_id: str) -> Optional[Dict[str, Any]]:
+    """Fetch a job record, or None if unknown."""
+    if redis_client is not None:
+        data = redis_client.hgetall(f"job:{job_id}")
+        if not data:
+            return None
+        return {k: (v if v != "" else None) for k, v in data.items()}
+    with JOBS_LOCK:
+        job = JOBS.get(job_id)
+        return dict(job) if job else None
+
+
+async def _job_get_async(job_id: str) -> Optional[Dict[str, Any]]:
+    """Endpoint-side fetch: Redis round-trips leave the event loop."""
+    if redis_client is not None:
+        return await asyncio.to_thread(_job_get, job_id)
+    return _job_get(job_id)
+
+
+async def _job_update_async(job_id: str, fields: Dict[str, Any]) -> None:
+    """Endpoint-side update: Redis round-trips leave the event loop."""
+    if redis_client is not None:
+        await asyncio.to_thread(_job_update, job_id, fields)
+    else:
+        _job_update(job_id, fields)
+
+
+def _job_set_active(job_id: str, active: bool) -> None:
+    """Track active (in-pipeline) jobs so /healthz doesn't scan every job."""
+    if redis_client is not None:
+        if active:
+            redis_client.sadd("jobs:active", job_id)
+        else:
+            redis_client.srem("jobs:active", job_id)
+    else:
+        with JOBS_LOCK:
+            if active:
+                ACTIVE_LOCAL.add(job_id)
+            else:
+                ACTIVE_LOCAL.discard(job_id)
+
+
+def _reap_local_jobs() -> None:
+    """Drop terminal jobs older than JOB_REAP_SECONDS so JOBS stays bounded."""
+    cutoff = time.time() - JOB_REAP_SECONDS
+    with JOBS_LOCK:
+        stale = [
+            jid for jid, job in JOBS.items()
+            if job.get("status") in {"completed", "failed"}
+            and (job.get("completed_at") or job.get("failed_at") or cutoff) < cutoff
+        ]
+        for jid in stale:
+            del JOBS[jid]
+            FUTURES.pop(jid, None)
+
+# Shared pool for the per-job S3 transfers (module-level so threads are
+# reused across jobs instead of being spawned per upload)
+UPLOAD_POOL = concurrent.futures.ThreadPoolExecutor(
+    max_workers=8, thread_name_prefix="s3-upload"
+)
+
+# Bounded pool for pipeline jobs: caps concurrent AI pipelines so burst
+# traffic queues instead of oversubscribing the box with unbounded threads
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline"
+)
+
 # ========== PIPELINE ==========
-def _run_pipeline(job_id: str, img_path: str, age_group: str, phone: Optional[str]):
+def _run_pipeline(job_id: str, upload, ext: str, age_group: str, phone: Optional[str]):
+    # `upload` is an in-memory (spooled) copy of the visitor photo; it never
+    # touches the uploads directory on disk.
+    upload_ctype = "image/jpeg" if ext in [".jpg", ".jpeg"] else "image/png"
+    terminal_recorded = False
     try:
-        with JOBS_LOCK:
-            JOBS[job_id] = {
-                "status": "image",
-                "video_url": None,
-                "image_url": None,
-                "video_path": None,  # Keep for compatibility
-                "error": None,
-                "phone": phone,
-                "started_at": time.time(),
-            }
+        _job_update(job_id, {
+            "status": "image",
+            "video_url": None,
+            "image_url": None,
+            "video_path": None,  # Keep for compatibility
+            "error": None,
+            "phone": phone,
+            "started_at": time.time(),
+        })
+        _job_set_active(job_id, True)
 
         if MOCK_MODE:
             # === MOCK MODE ===
@@ -215,8 +476,7 @@ def _run_pipeline(job_id: str, img_path: str, age_group: str, phone: Optional[st
             
             # Simulate processing time (5 seconds total)
             time.sleep(2)  # Image processing
-            with JOBS_LOCK:
-                JOBS[job_id]["status"] = "video"
+            _job_update(job_id, {"status": "video"})
             
             time.sleep(3)  # Video processing
             
@@ -227,50 +487,57 @@ def _run_pipeline(job_id: str, img_path: str, age_group: str, phone: Optional[st
         else:
             # === REAL MODE ===
             # Step 1: Image generation
-            edited_img_url = nano_banana_edit(img1=img_path, age_gap=age_group)
+            upload.seek(0)
+            edited_img_url = nano_banana_edit(
+                img1=upload, age_gap=age_group, mime_type=upload_ctype
+            )
             if not edited_img_url:
                 raise RuntimeError("Image generation failed")
 
-            with JOBS_LOCK:
-                JOBS[job_id]["status"] = "video"
+            _job_update(job_id, {"status": "video"})
 
             # Step 2: Video generation
             video_url_remote = wans2v(img=edited_img_url, age_gap=age_group)
             if not video_url_remote:
                 raise RuntimeError("Video generation failed")
 
-        # Step 3: Store media (S3 or local)
-        if USE_S3:
+        # Step 3: Store media (S3 or local; S3 only once credentials
+        # verified at startup, otherwise jobs fall back to local storage)
+        if USE_S3 and S3_READY:
             # === S3 STORAGE ===
-            # Upload original (optional audit trail)
-            ext = Path(img_path).suffix.lower() or ".jpg"
+            local_video_path = None
             upload_key = _s3_key("uploads", f"{job_id}{ext}")
-            _s3_put_file(
-                img_path,
-                upload_key,
-                "image/jpeg" if ext in [".jpg", ".jpeg"] else "image/png"
-            )
-
-            # Download and upload edited image
-            img_resp = requests.get(edited_img_url, timeout=60)
-            img_resp.raise_for_status()
             image_key = _s3_key("images", f"{job_id}.jpeg")
-            _s3_put_bytes(
-                img_resp.content,
-                image_key,
-                img_resp.headers.get("Content-Type", "image/jpeg")
-            )
-
-            # Download and upload video
-            vid_resp = requests.get(video_url_remote, timeout=300)
-            vid_resp.raise_for_status()
             video_key = _s3_key("videos", f"{job_id}.mp4")
-            _s3_put_bytes(vid_resp.content, video_key, "video/mp4")
+
+            # The three transfers are independent I/O, so run them
+            # concurrently: storage cost becomes max() instead of sum()
+            upload.seek(0)
+            futures = [
+                # Original upload (optional audit trail), straight from memory
+                UPLOAD_POOL.submit(_s3_put_stream, upload, upload_key, upload_ctype),
+                # Edited image, streamed straight to S3
+                UPLOAD_POOL.submit(
+                    _upload_remote, edited_img_url, image_key, "image/jpeg", 60
+                ),
+                # Video, multipart upload overlapping the download
+                UPLOAD_POOL.submit(
+                    _upload_remote, video_url_remote, video_key, "video/mp4", 300
+                ),
+            ]
+            concurrent.futures.wait(futures)
+            for fut in futures:
+                fut.result()  # re-raise the first transfer failure
 
             # Generate URLs
             final_video_url = _s3_url_for_key(video_key)
             final_image_url = _s3_url_for_key(image_key)
-            
+
+            # Render the QR code once at completion; every later request
+            # redirects to the stored PNG instead of re-encoding it
+            qr_key = _s3_key("qr", f"{job_id}.png")
+            _s3_put_stream(_render_qr_png(final_video_url), qr_key, "image/png")
+
         else:
             # === LOCAL STORAGE ===
             # Save image and video locally
@@ -285,32 +552,52 @@ def _run_pipeline(job_id: str, img_path: str, age_group: str, phone: Optional[st
             rel_img_url = f"/media/images/{job_id}.jpeg"
             final_image_url = f"{PUBLIC_BASE_URL}{rel_img_url}" if PUBLIC_BASE_URL else rel_img_url
 
+            # Render the QR code once; the StaticFiles mount serves it from
+            # disk with no further Python work
+            qr_key = None
+            qr_path = os.path.join(ROOT_DIR, "result", "qr", f"{job_id}.png")
+            with open(qr_path, "wb") as f:
+                f.write(_render_qr_png(final_video_url).getvalue())
+
         # Update job status
-        with JOBS_LOCK:
-            JOBS[job_id]["status"] = "completed"
-            JOBS[job_id]["video_url"] = final_video_url
-            JOBS[job_id]["image_url"] = final_image_url
-            JOBS[job_id]["video_path"] = local_video_path if not USE_S3 else None
-            JOBS[job_id]["completed_at"] = time.time()
+        _job_update(job_id, {
+            "status": "completed",
+            "video_url": final_video_url,
+            "image_url": final_image_url,
+            "video_path": local_video_path,
+            "qr_key": qr_key,
+            "completed_at": time.time(),
+        })
+        _job_set_active(job_id, False)
+        terminal_recorded = True
 
     except Exception as e:
-        with JOBS_LOCK:
-            JOBS[job_id] = {
-                "status": "failed",
-                "video_url": None,
-                "image_url": None,
-                "video_path": None,
-                "error": f"{type(e).__name__}: {e}",
-                "phone": phone,
-                "failed_at": time.time(),
-            }
+        _job_update(job_id, {
+            "status": "failed",
+            "video_url": None,
+            "image_url": None,
+            "video_path": None,
+            "error": f"{type(e).__name__}: {e}",
+            "phone": phone,
+            "failed_at": time.time(),
+        })
+        _job_set_active(job_id, False)
+        terminal_recorded = True
     finally:
-        # Clean up temp upload
+        # Release the buffered upload (and its spill file, if any)
         try:
-            if os.path.exists(img_path):
-                os.remove(img_path)
+            upload.close()
         except Exception:
             pass
+        # Drop this job's future once its terminal state is recorded, in
+        # every store backend — otherwise FUTURES grows per job forever.
+        # A future whose job never went terminal is kept so job_status
+        # can still detect the crashed worker.
+        if terminal_recorded:
+            FUTURES.pop(job_id, None)
+        # Bound local job-store memory now that this job is terminal
+        if redis_client is None:
+            _reap_local_jobs()
 
 # ========== API ENDPOINTS ==========
 @app.post("/api/jobs")
@@ -319,49 +606,83 @@ async def create_job(
     age_group: str = Form(...),
     phone: Optional[str] = Form(None),
 ):
-    if age_group not in {"Male", "Female", "Boy", "Girl"}:
+    if age_group not in ALLOWED_AGE_GROUPS:
         raise HTTPException(400, detail="Invalid age_group")
     if image.content_type not in {"image/jpeg", "image/png"}:
         raise HTTPException(400, detail="Only JPEG/PNG images are accepted")
 
+    # Reject oversized uploads from the declared length, before reading a byte
+    try:
+        declared_size = int(image.headers.get("content-length", 0))
+    except (TypeError, ValueError):
+        declared_size = 0
+    if declared_size > MAX_UPLOAD_SIZE:
+        raise HTTPException(413, detail=f"File too large (max {MAX_UPLOAD_SIZE_MB}MB)")
+
     job_id = str(uuid.uuid4())
-    ext = Path(image.filename).suffix or ".jpg"
-    upload_path = os.path.join(UPLOAD_DIR, f"{job_id}{ext}")
+    ext = (Path(image.filename).suffix or ".jpg").lower()
 
-    # Stream to disk with size limit
+    # Buffer in memory with size limit (spills to a temp file only if a
+    # client lies about its size); nothing lands in the uploads directory.
+    # Writes here are plain memcpys into the spool buffer — no per-chunk
+    # write(2) syscalls to batch, so kernel I/O tricks buy nothing.
+    upload = tempfile.SpooledTemporaryFile(max_size=MAX_UPLOAD_SIZE)
     read = 0
     chunk_size = 1024 * 1024
     try:
-        with open(upload_path, "wb") as f:
-            while True:
-                chunk = await image.read(chunk_size)
-                if not chunk:
-                    break
-                read += len(chunk)
-                if read > MAX_UPLOAD_SIZE:
-                    raise HTTPException(413, detail=f"File too large (max {MAX_UPLOAD_SIZE_MB}MB)")
-                f.write(chunk)
+        while True:
+            chunk = await image.read(chunk_size)
+            if not chunk:
+                break
+            if read == 0 and not (
+                chunk.startswith(JPEG_MAGIC) or chunk.startswith(PNG_MAGIC)
+            ):
+                # Magic-number mismatch: don't buffer the rest
+                upload.close()
+                raise HTTPException(400, detail="File content is not a JPEG or PNG image")
+            read += len(chunk)
+            if read > MAX_UPLOAD_SIZE:
+                upload.close()
+                raise HTTPException(413, detail=f"File too large (max {MAX_UPLOAD_SIZE_MB}MB)")
+            upload.write(chunk)
     finally:
         await image.close()
-
-    # Start background processing
-    t = threading.Thread(
-        target=_run_pipeline,
-        args=(job_id, upload_path, age_group, phone),
-        daemon=True
-    )
-    t.start()
+    upload.seek(0)
+
+    # Queue background processing on the bounded worker pool
+    await _job_update_async(job_id, {
+        "status": "queued",
+        "video_url": None,
+        "image_url": None,
+        "video_path": None,
+        "error": None,
+        "phone": phone,
+        "queued_at": time.time(),
+    })
+    FUTURES[job_id] = EXECUTOR.submit(_run_pipeline, job_id, upload, ext, age_group, phone)
 
     return {"job_id": job_id}
 
 @app.get("/api/jobs/{job_id}")
 async def job_status(job_id: str):
-    with JOBS_LOCK:
-        job = JOBS.get(job_id)
+    job = await _job_get_async(job_id)
 
     if not job:
         return JSONResponse({"status": "queued"})
 
+    # Detect a worker that died without recording a result
+    future = FUTURES.get(job_id)
+    if (
+        future is not None
+        and future.done()
+        and future.exception() is not None
+        and job["status"] not in {"completed", "failed"}
+    ):
+        job["status"] = "failed"
+        job["error"] = f"Worker crashed: {future.exception()}"
+        await _job_update_async(job_id, {"status": job["status"], "error": job["error"]})
+        FUTURES.pop(job_id, None)
+
     resp = {"status": job["status"], "error": job.get("error")}
     
     if job["status"] == "completed":
@@ -373,28 +694,50 @@ async def job_status(job_id: str):
 
 @app.get("/api/jobs/{job_id}/qr")
 async def job_qr(job_id: str):
-    with JOBS_LOCK:
-        job = JOBS.get(job_id)
+    job = await _job_get_async(job_id)
 
     if not job or job.get("status") != "completed" or not job.get("video_url"):
         raise HTTPException(404, detail="QR not available")
 
-    # Generate QR code with video URL
-    qr_img = generate_qr_code(job["video_url"])
-    buf = BytesIO()
-    qr_img.save(buf, format="PNG")
-    buf.seek(0)
-    
+    # Serve the QR rendered at pipeline completion
+    qr_key = job.get("qr_key")
+    if USE_S3 and qr_key:
+        return RedirectResponse(
+            _s3_url_for_key(qr_key),
+            headers={"Cache-Control": "public, max-age=3600"},
+        )
+    if os.path.exists(os.path.join(ROOT_DIR, "result", "qr", f"{job_id}.png")):
+        return RedirectResponse(
+            f"/media/qr/{job_id}.png",
+            headers={"Cache-Control": "public, max-age=3600"},
+        )
+
+    # Fallback for jobs completed before the QR cache existed (off the
+    # event loop: Reed-Solomon encoding + PNG deflate are CPU-bound)
+    buf = await asyncio.to_thread(_render_qr_png, job["video_url"])
+
     return StreamingResponse(
         buf,
         media_type="image/png",
         headers={"Cache-Control": "public, max-age=3600"}
     )
 
+@functools.lru_cache(maxsize=256)
+def _cached_questions(count: int, seed: str) -> tuple:
+    """Seeded sampling is deterministic, so repeat requests skip the
+    question-bank load entirely."""
+    return tuple(get_random_questions(count=count, seed=seed))
+
+
 @app.get("/api/questions")
-async def get_questions(count: int = 10, seed: Optional[str] = None):
+async def get_questions(response: Response, count: int = 10, seed: Optional[str] = None):
     try:
-        qs = get_random_questions(count=count, seed=seed)
+        if seed is not None:
+            qs = list(_cached_questions(count, str(seed)))
+            response.headers["Cache-Control"] = "public, max-age=300"
+        else:
+            # Unseeded requests want a fresh random sample; never cache
+            qs = get_random_questions(count=count)
         sanitized = [
             {"id": q["id"], "question": q["question"], "options": q["options"]}
             for q in qs
@@ -413,33 +756,35 @@ async def submit_answers(job_id: str, payload: Dict[str, Any]):
     result = grade_answers(key, answers)
 
     # Save quiz result (local only, not in S3)
-    os.makedirs(os.path.join(ROOT_DIR, "result", "quiz"), exist_ok=True)
-    record_path = os.path.join(ROOT_DIR, "result", "quiz", f"{job_id}.json")
-    with open(record_path, "w", encoding="utf-8") as f:
-        f.write(
-            (
-                "{\n"
-                f'  "score": {result["score"]},\n'
-                f'  "correct": {result["correct"]},\n'
-                f'  "total": {result["total"]}\n'
-                "}\n"
-            )
-        )
+    record_path = os.path.join(QUIZ_DIR, f"{job_id}.json")
+    record = orjson.dumps(
+        {"score": result["score"], "correct": result["correct"], "total": result["total"]},
+        option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE,
+    )
+    async with aiofiles.open(record_path, "wb") as f:
+        await f.write(record)
 
     return result
 
 @app.get("/healthz")
 async def healthz():
+    # Off the event loop: scard is a blocking network round-trip
+    if redis_client is not None:
+        jobs_active = await asyncio.to_thread(redis_client.scard, "jobs:active")
+    else:
+        jobs_active = len(ACTIVE_LOCAL)
+
     health = {
         "ok": True,
         "time": int(time.time()),
-        "storage": "s3" if USE_S3 else "local",
-        "jobs_active": len([j for j in JOBS.values() if j["status"] in {"image", "video"}]),
+        "storage": "s3" if (USE_S3 and S3_READY) else "local",
+        "jobs_active": jobs_active,
     }
     
     if USE_S3:
         try:
-            s3.head_bucket(Bucket=S3_BUCKET)
+            # Off the event loop: head_bucket is a blocking network round-trip
+            await asyncio.to_thread(s3.head_bucket, Bucket=S3_BUCKET)
             health["s3_status"] = "connected"
             health["s3_bucket"] = S3_BUCKET
             health["s3_region"] = AWS_REGION
@@ -1,4 +1,6 @@
 import os
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
 
 # Base directory for the project's data assets (this keeps paths portable)
 BASE = os.path.join(os.path.dirname(__file__), "data")
@@ -34,3 +36,20 @@ prompt_bw = "The boy is singing."
 audio_g = os.path.join(BASE, "girl", "audio1.mp3")
 prompt_gw = "The girl is singing."
 
+
+# 3) Frozen lookup of the per-age-group assets, built once at import so
+#    consumers do a single mapping access instead of branching per call
+class AgeGroupAssets(NamedTuple):
+    img: str
+    prompt: str
+    audio: str
+    prompt_wan: str
+
+
+ASSETS: Mapping[str, AgeGroupAssets] = MappingProxyType({
+    "Male": AgeGroupAssets(img=img3_m, prompt=prompt_m, audio=audio_m, prompt_wan=prompt_mw),
+    "Female": AgeGroupAssets(img=img3_f, prompt=prompt_f, audio=audio_f, prompt_wan=prompt_fw),
+    "Boy": AgeGroupAssets(img=img3_b, prompt=prompt_b, audio=audio_b, prompt_wan=prompt_bw),
+    "Girl": AgeGroupAssets(img=img3_g, prompt=prompt_g, audio=audio_g, prompt_wan=prompt_gw),
+})
+
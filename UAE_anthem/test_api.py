@@ -28,6 +28,7 @@ import json
 url = "https://api.wavespeed.ai/api/v3/predictions"
 headers = {
     "Authorization": f"Bearer {API_KEY}",
+    "Accept-Encoding": "gzip",
 }
 
 try:
@@ -1,5 +1,6 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter, Retry
 import json
 import time
 import base64
@@ -12,17 +13,27 @@ from data_info import *
 
 load_dotenv()
 API_KEY = os.getenv("WSAI_KEY")
+
+# Shared session: task submission, result polling, and media downloads all
+# hit the same host, so keep-alive saves a TCP+TLS handshake per call.
+# Retry only applies to idempotent methods (polling GETs), not the POSTs.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+))
 # Create result folder if it doesn't exist
 os.makedirs("result/videos", exist_ok=True)
 os.makedirs("result/images", exist_ok=True)
 
-def compress_image(image_path, max_size_kb=900, quality=85):
+def compress_image(image, max_size_kb=900, quality=85):
     """
     Compress image to target size while maintaining quality.
     Only compresses if image is larger than max_size_kb.
 
     Args:
-        image_path: Path to the image file
+        image: Path to the image file, or a binary file-like object
         max_size_kb: Target maximum size in KB (default 900KB)
         quality: JPEG quality 1-100 (default 85)
 
@@ -31,7 +42,12 @@ def compress_image(image_path, max_size_kb=900, quality=85):
     """
     try:
         # Check current file size first
-        current_size_kb = os.path.getsize(image_path) / 1024
+        if hasattr(image, "read"):
+            image.seek(0, os.SEEK_END)
+            current_size_kb = image.tell() / 1024
+            image.seek(0)
+        else:
+            current_size_kb = os.path.getsize(image) / 1024
 
         # If already small enough, return None (no compression needed)
         if current_size_kb <= max_size_kb:
@@ -40,7 +56,7 @@ def compress_image(image_path, max_size_kb=900, quality=85):
 
         print(f"Image size: {current_size_kb:.1f}KB - compressing to {max_size_kb}KB...")
 
-        img = Image.open(image_path)
+        img = Image.open(image)
 
         # Convert RGBA to RGB if necessary
         if img.mode in ('RGBA', 'LA', 'P'):
@@ -82,20 +98,39 @@ def compress_image(image_path, max_size_kb=900, quality=85):
         return None
 
 
-def file_to_base64(file_path, compress=False, max_size_kb=900):
+def file_to_base64(file, compress=False, max_size_kb=900, mime_type=None):
     """
     Helper function to convert a file to a base64 string with the correct MIME type.
 
     Args:
-        file_path: Path to the file
+        file: Path to the file, or a binary file-like object
         compress: Whether to compress images (default False)
         max_size_kb: Maximum size in KB for compression (default 900KB)
+        mime_type: MIME type override (required for file-like objects,
+                   defaults to image/jpeg)
     """
+    # File-like objects (e.g. in-memory uploads) skip the disk entirely
+    if hasattr(file, "read"):
+        if mime_type is None:
+            mime_type = "image/jpeg"
+
+        if compress and mime_type.startswith('image/'):
+            compressed = compress_image(file, max_size_kb=max_size_kb, quality=85)
+            if compressed:
+                encoded_string = base64.b64encode(compressed.read()).decode('utf-8')
+                return f"data:{mime_type};base64,{encoded_string}"
+
+        file.seek(0)
+        encoded_string = base64.b64encode(file.read()).decode('utf-8')
+        return f"data:{mime_type};base64,{encoded_string}"
+
+    file_path = file
     if not os.path.exists(file_path):
         print(f"Error: File not found at {file_path}")
         return None
 
-    mime_type, _ = mimetypes.guess_type(file_path)
+    if mime_type is None:
+        mime_type, _ = mimetypes.guess_type(file_path)
     if mime_type is None:
         if file_path.endswith(".mp3"):
             mime_type = "audio/mpeg"
@@ -119,9 +154,10 @@ def file_to_base64(file_path, compress=False, max_size_kb=900):
 
 
 # CHANGED: Renamed from qwen_edit to nano_banana_edit
-def nano_banana_edit(img1, age_gap):
-    # 1. Convert User Uploaded Image (img1) to Base64 WITH COMPRESSION
-    img1_b64 = file_to_base64(img1, compress=True, max_size_kb=900)
+def nano_banana_edit(img1, age_gap, mime_type=None):
+    # 1. Convert User Uploaded Image (img1, a path or file-like object)
+    #    to Base64 WITH COMPRESSION
+    img1_b64 = file_to_base64(img1, compress=True, max_size_kb=900, mime_type=mime_type)
     if not img1_b64:
         print("Failed to encode input image")
         return None
@@ -130,18 +166,9 @@ def nano_banana_edit(img1, age_gap):
     img2_path = bg_path
 
     # Costume Image selection
-    if age_gap == "Male":
-        img3_path = img3_m
-        prompt = prompt_m
-    elif age_gap == "Female":
-        img3_path = img3_f
-        prompt = prompt_f
-    elif age_gap == "Boy":
-        img3_path = img3_b
-        prompt = prompt_b
-    else:
-        img3_path = img3_g
-        prompt = prompt_g
+    assets = ASSETS.get(age_gap, ASSETS["Girl"])
+    img3_path = assets.img
+    prompt = assets.prompt
 
     # 3. Convert Local Assets to Base64 WITH COMPRESSION
     img2_b64 = file_to_base64(img2_path, compress=True, max_size_kb=900)
@@ -169,7 +196,7 @@ def nano_banana_edit(img1, age_gap):
     }
 
     begin = time.time()
-    response = requests.post(url, headers=headers, data=json.dumps(payload))
+    response = SESSION.post(url, headers=headers, data=json.dumps(payload))
     if response.status_code == 200:
         result = response.json()["data"]
         request_id = result["id"]
@@ -185,7 +212,7 @@ def nano_banana_edit(img1, age_gap):
     max_retries = 360
     retry_count = 0
     while retry_count < max_retries:
-        response = requests.get(url, headers=headers)
+        response = SESSION.get(url, headers=headers)
         if response.status_code == 200:
             result = response.json()["data"]
             status = result["status"]
@@ -211,18 +238,9 @@ def wans2v(img, age_gap):
     # Note: 'img' here is already a URL (output from qwen_edit), so we don't convert it.
 
     # Select audio and prompt
-    if age_gap == "Male":
-        audio_path = audio_m
-        prompt = prompt_mw
-    elif age_gap == "Female":
-        audio_path = audio_f
-        prompt = prompt_fw
-    elif age_gap == "Boy":
-        audio_path = audio_b
-        prompt = prompt_bw
-    else:
-        audio_path = audio_g
-        prompt = prompt_gw
+    assets = ASSETS.get(age_gap, ASSETS["Girl"])
+    audio_path = assets.audio
+    prompt = assets.prompt_wan
 
     # Convert local audio file to Base64
     audio_b64 = file_to_base64(audio_path)
@@ -244,7 +262,7 @@ def wans2v(img, age_gap):
     }
 
     begin = time.time()
-    response = requests.post(url, headers=headers, data=json.dumps(payload))
+    response = SESSION.post(url, headers=headers, data=json.dumps(payload))
     if response.status_code == 200:
         result = response.json()["data"]
         request_id = result["id"]
@@ -260,7 +278,7 @@ def wans2v(img, age_gap):
     max_retries = 240
     retry_count = 0
     while retry_count < max_retries:
-        response = requests.get(url, headers=headers)
+        response = SESSION.get(url, headers=headers)
         if response.status_code == 200:
             result = response.json()["data"]
             status = result["status"]
@@ -284,7 +302,7 @@ def save_video(url, id):
     if url is None:
         print("Error: No URL provided")
         return None
-    response = requests.get(url)
+    response = SESSION.get(url)
     if response.status_code == 200:
         file_path = f"result/videos/{id}.mp4"
         with open(file_path, "wb") as f:
@@ -300,7 +318,7 @@ def save_photo(url, id):
     if url is None:
         print("Error: No URL provided")
         return None
-    response = requests.get(url)
+    response = SESSION.get(url)
     if response.status_code == 200:
         file_path = f"result/images/{id}.jpeg"
         with open(file_path, "wb") as f:
@@ -329,9 +347,10 @@ def generate_qr_code(video_path):
     # Create QR code image
     qr_img = qr.make_image(fill_color="black", back_color="white")
 
-    # Convert to PIL Image and save to BytesIO
+    # Convert to PIL Image and save to BytesIO (low compression effort:
+    # QR line art deflates trivially at any level)
     buffer = BytesIO()
-    qr_img.save(buffer, format='PNG')
+    qr_img.save(buffer, format='PNG', compress_level=1)
     buffer.seek(0)
 
     return Image.open(buffer)